@@ -1,24 +1,55 @@
 import time
 import random
+import asyncio
 from datetime import datetime
-import threading
-from queue import Queue
-import logging
 import csv
+from collections import deque
 from dataclasses import dataclass
 from typing import Optional
 import os
+import sys
+import numpy as np
+
+# Offset that maps time.monotonic_ns() readings onto wall-clock epoch nanoseconds
+_WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+def _format_ns(monotonic_ns):
+    """Format a time.monotonic_ns() reading as a wall-clock timestamp string"""
+    seconds, nanos = divmod(monotonic_ns + _WALL_CLOCK_OFFSET_NS, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanos // 1000).isoformat(sep=' ', timespec='microseconds')
+
+# CSV column order shared by the header and every row tuple
+CSV_FIELDS = ('player_id', 'server_id', 'start_time', 'end_time', 'processing_time')
+
+# Preallocated per-request metrics record; end_ns is 0 until the request completes.
+# Player ids are kept in a side list indexed by slot, since a fixed-width string field would truncate them
+METRICS_DTYPE = np.dtype([
+    ('server_idx', 'i4'),
+    ('start_ns', 'i8'),
+    ('end_ns', 'i8'),
+    ('processing_time', 'f8'),
+])
+
+# Last whole second seen by _hms() and its formatted display string
+_ts_cache = [0, '']
+
+def _hms():
+    """Return the current local time as HH:MM:SS, formatting at most once per second"""
+    s = int(time.time())
+    if s != _ts_cache[0]:
+        _ts_cache[:] = [s, time.strftime('%H:%M:%S', time.localtime(s))]
+    return _ts_cache[1]
 
 @dataclass
 class PlayerMetrics:
     """
     Data class to store metrics for each player request
-    Tracks player ID, server assignment, timing, and processing duration
+    Tracks player ID, server assignment, monotonic timing in nanoseconds, and processing duration
     """
     player_id: str
     server_id: str
-    start_time: datetime
-    end_time: Optional[datetime] = None
+    start_ns: int
+    end_ns: Optional[int] = None
     processing_time: Optional[float] = None
 
     def to_dict(self):
@@ -26,201 +57,376 @@ class PlayerMetrics:
         return {
             'player_id': self.player_id,
             'server_id': self.server_id,
-            'start_time': self.start_time.strftime("%Y-%m-%d %H:%M:%S.%f"),
-            'end_time': self.end_time.strftime("%Y-%m-%d %H:%M:%S.%f") if self.end_time else '',
+            'start_time': _format_ns(self.start_ns),
+            'end_time': _format_ns(self.end_ns) if self.end_ns else '',
             'processing_time': f"{self.processing_time:.3f}" if self.processing_time else ''
         }
 
+    def to_row(self):
+        """Convert metrics to a plain tuple in CSV_FIELDS order"""
+        return (
+            self.player_id,
+            self.server_id,
+            _format_ns(self.start_ns),
+            _format_ns(self.end_ns) if self.end_ns else '',
+            f"{self.processing_time:.3f}" if self.processing_time else ''
+        )
+
 class MetricsLogger:
     """
     Handles logging of player request metrics to both text and CSV files
-    Provides thread-safe logging operations
+    Requests are recorded in preallocated NumPy structured-array blocks, and completed
+    rows are written out in batches, either once FLUSH_ROWS are pending or by a periodic flusher task
     """
-    def __init__(self):
+    FLUSH_INTERVAL = 0.05
+    FLUSH_ROWS = 64
+
+    def __init__(self, server_ids=(), capacity=1024):
         # Create output/logs directory if it doesn't exist
         os.makedirs('output/logs', exist_ok=True)
         
-        # Configure text file logging
-        logging.basicConfig(
-            filename='output/logs/server_logs.txt',
-            level=logging.INFO,
-            format='%(asctime)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        # Metrics storage: fixed-size blocks of METRICS_DTYPE records, one slot per in-flight request.
+        # Slots return to the free list once flushed, so storage is bounded by peak outstanding requests
+        self.server_ids = list(server_ids)
+        self._server_index = {server_id: idx for idx, server_id in enumerate(self.server_ids)}
+        self._block_size = max(capacity, 1)
+        self._blocks = [np.empty(self._block_size, dtype=METRICS_DTYPE)]
+        self._player_ids = [None] * self._block_size
+        self._free_slots = deque(range(self._block_size))
+        
+        # Slots handed out by start_request but not yet finished or released
+        self._in_flight = set()
         
-        # Set up CSV logging
-        self.csv_file = 'output/logs/metrics.csv'
+        # Set up CSV and text logging on persistently open file handles
+        self._fh = open('output/logs/metrics.csv', 'w', newline='', buffering=1 << 16)
+        self._writer = csv.writer(self._fh)
+        self._text_fh = open('output/logs/server_logs.txt', 'a', buffering=1 << 16)
         self.write_csv_header()
         
-        # Thread-safe lock for file operations
-        self.log_lock = threading.Lock()
+        # Completed slots waiting to be written; the periodic flusher task is created by start()
+        self._pending = deque()
+        self._flusher = None
 
     def write_csv_header(self):
         """Initialize CSV file with column headers"""
-        with open(self.csv_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['player_id', 'server_id', 'start_time', 'end_time', 'processing_time'])
-            writer.writeheader()
+        self._writer.writerow(CSV_FIELDS)
+
+    def start_request(self, player_id, server_idx, start_ns):
+        """Reserve a metrics slot for a new request and return its index"""
+        if not self._free_slots:
+            first = len(self._blocks) * self._block_size
+            self._blocks.append(np.empty(self._block_size, dtype=METRICS_DTYPE))
+            self._player_ids.extend([None] * self._block_size)
+            self._free_slots.extend(range(first, first + self._block_size))
+        slot = self._free_slots.popleft()
+        block, offset = divmod(slot, self._block_size)
+        self._blocks[block][offset] = (server_idx, start_ns, 0, 0.0)
+        self._player_ids[slot] = player_id
+        self._in_flight.add(slot)
+        return slot
+
+    def finish_request(self, slot, end_ns, processing_time):
+        """Complete a request's metrics slot and queue it for logging"""
+        self._in_flight.discard(slot)
+        block, offset = divmod(slot, self._block_size)
+        record = self._blocks[block]
+        record['end_ns'][offset] = end_ns
+        record['processing_time'][offset] = processing_time
+        
+        # Queue the slot; formatting both log formats is deferred to flush()
+        self._pending.append(slot)
+        if len(self._pending) >= self.FLUSH_ROWS:
+            self.flush()
+
+    def release_request(self, slot):
+        """
+        Return an unfinished request's slot to the free list without logging it
+        Returns False if the slot was already finished, so it is left to the flusher
+        """
+        if slot not in self._in_flight:
+            return False
+        self._in_flight.remove(slot)
+        self._player_ids[slot] = None
+        self._free_slots.append(slot)
+        return True
 
     def log_request(self, metrics: PlayerMetrics):
-        """Log player request metrics to both text and CSV files"""
-        with self.log_lock:
-            # Log to text file
-            logging.info(
-                f"Player: {metrics.player_id}, Server: {metrics.server_id}, "
-                f"Processing Time: {metrics.processing_time:.3f}s"
-            )
-            
-            # Log to CSV file
-            with open(self.csv_file, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['player_id', 'server_id', 'start_time', 'end_time', 'processing_time'])
-                writer.writerow(metrics.to_dict())
+        """Log a completed PlayerMetrics instance to both text and CSV files"""
+        if metrics.server_id not in self._server_index:
+            self._server_index[metrics.server_id] = len(self.server_ids)
+            self.server_ids.append(metrics.server_id)
+        slot = self.start_request(metrics.player_id, self._server_index[metrics.server_id], metrics.start_ns)
+        self.finish_request(slot, metrics.end_ns or 0, metrics.processing_time or 0.0)
+
+    def _to_row(self, slot):
+        """Convert a metrics slot to a plain tuple in CSV_FIELDS order"""
+        block, offset = divmod(slot, self._block_size)
+        server_idx, start_ns, end_ns, processing_time = self._blocks[block][offset].item()
+        return (
+            self._player_ids[slot],
+            self.server_ids[server_idx],
+            _format_ns(start_ns),
+            _format_ns(end_ns) if end_ns else '',
+            f"{processing_time:.3f}" if processing_time else ''
+        )
+
+    def start(self):
+        """Start the periodic flusher task on the running event loop"""
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Background task that periodically writes pending rows to disk"""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """Write all pending rows to the CSV file"""
+        if not self._pending:
+            return
+        rows = [self._to_row(slot) for slot in self._pending]
+        for slot in self._pending:
+            self._player_ids[slot] = None
+        self._free_slots.extend(self._pending)
+        self._pending.clear()
+        self._writer.writerows(rows)
+        self._fh.flush()
+        self._text_fh.writelines([self._format_text_line(row) for row in rows])
+        self._text_fh.flush()
+
+    @staticmethod
+    def _format_text_line(row):
+        """Render a CSV row as a human-readable text log line"""
+        player_id, server_id, _, end_time, processing_time = row
+        return (
+            f"{end_time[:19]} - Player: {player_id}, Server: {server_id}, "
+            f"Processing Time: {processing_time}s\n"
+        )
+
+    def close(self):
+        """Stop the flusher task, write any remaining rows and close the CSV file"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        self.flush()
+        self._fh.close()
+        self._text_fh.close()
 
 class GameServer:
     """
     Represents a game server instance that processes player requests
     Includes request queue management and metric tracking
     """
-    def __init__(self, id, metrics_logger):
+    def __init__(self, id, metrics_logger, idx=0):
         self.id = id
-        self.players = []
+        self.idx = idx
+        self.player_count = 0
+        self.recent_players = deque(maxlen=16)
         self.is_active = True
-        self.request_queue = Queue()
+        self.request_queue = asyncio.Queue(maxsize=1024)
         self.metrics_logger = metrics_logger
         self.load_balancer = None
-        self.processing_thread = threading.Thread(target=self._process_queue, daemon=True)
-        self.processing_thread.start()
+        
+        # Console output is off by default; the constant part of each message is built once
+        self.verbose = False
+        self._processed_prefix = f"] {self.id} processed request from Player_"
+        
+        # Worker task consuming request_queue, created by start() on the running event loop
+        self._worker = None
+
+    def start(self):
+        """Start the worker task that processes this server's queue"""
+        self._worker = asyncio.create_task(self._process_queue())
+        return self._worker
 
     def handle_player(self, player_id):
         """Add a new player request to the server's processing queue"""
         if self.is_active:
-            self.players.append(player_id)
-            metrics = PlayerMetrics(
-                player_id=player_id,
-                server_id=self.id,
-                start_time=datetime.now()
-            )
-            self.request_queue.put((player_id, metrics))
+            # Without a running worker the request would sit in the queue forever
+            if self._worker is None or self._worker.done():
+                return False
+            if self.request_queue.full():
+                return False
+            slot = self.metrics_logger.start_request(player_id, self.idx, time.monotonic_ns())
+            self.request_queue.put_nowait((player_id, slot))
+            self.player_count += 1
+            self.recent_players.append(player_id)
             return True
         return False
 
-    def _process_queue(self):
-        """Background thread that continuously processes queued player requests"""
+    async def _process_queue(self):
+        """Worker task that awaits queued player requests and processes them one at a time"""
         while True:
-            if not self.request_queue.empty():
-                player_id, metrics = self.request_queue.get()
-                self._handle_request(player_id, metrics)
-            time.sleep(0.1)
+            item = await self.request_queue.get()
+            if item is None:
+                self.request_queue.task_done()
+                break
+            player_id, slot = item
+            try:
+                await self._handle_request(player_id, slot)
+            except Exception as exc:
+                # Keep serving the rest of the queue; a dead worker would hang request_queue.join()
+                if self.metrics_logger.release_request(slot):
+                    print(f"❌ [{_hms()}] {self.id} failed to process request from Player_{player_id}: {exc!r}",
+                          file=sys.stderr)
+                else:
+                    print(f"❌ [{_hms()}] {self.id} error after logging request from Player_{player_id}: {exc!r}",
+                          file=sys.stderr)
+            finally:
+                self.request_queue.task_done()
 
-    def _handle_request(self, player_id, metrics: PlayerMetrics):
+    def stop(self):
+        """
+        Stop accepting players and let the worker task exit once the queue drains
+        If the queue is too full to take the stop sentinel, the worker is cancelled instead
+        """
+        self.is_active = False
+        try:
+            self.request_queue.put_nowait(None)
+        except asyncio.QueueFull:
+            if self._worker is not None:
+                self._worker.cancel()
+
+    async def _handle_request(self, player_id, slot):
         """Process a single player request and update its metrics"""
         # Simulate processing time between 1-3 seconds
         processing_time = random.uniform(1, 3)
-        time.sleep(processing_time)
-        
-        # Update metrics
-        metrics.end_time = datetime.now()
-        metrics.processing_time = processing_time
+        await asyncio.sleep(processing_time)
         
-        # Log metrics
-        self.metrics_logger.log_request(metrics)
+        # Update and log metrics
+        self.metrics_logger.finish_request(slot, time.monotonic_ns(), processing_time)
         
         # Update load balancer statistics
         if self.load_balancer:
-            self.load_balancer.update_metrics(self.id, processing_time)
+            self.load_balancer.update_metrics(self.idx, processing_time)
         
         # Log completion to console
-        completion_time = datetime.now().strftime("%H:%M:%S")
-        print(f"✨ [{completion_time}] {self.id} processed request from Player_{player_id} in {processing_time:.2f} seconds")
+        if self.verbose:
+            completion_time = _hms()
+            sys.stdout.write(''.join(["✨ [", completion_time, self._processed_prefix, str(player_id),
+                                      " in ", format(processing_time, '.2f'), " seconds\n"]))
 
     def get_status(self):
         """Return current server status and statistics"""
         return {
             'id': self.id,
             'active': self.is_active,
-            'player_count': len(self.players),
-            'players': self.players,
+            'player_count': self.player_count,
+            'recent_players': list(self.recent_players),
             'queued_requests': self.request_queue.qsize()
         }
 
 class GameLoadBalancer:
     """
-    Implements a round-robin load balancer for game servers
-    Distributes player requests evenly across multiple servers
+    Implements a power-of-two-choices load balancer for game servers
+    Sends each player request to the less loaded of two randomly sampled servers
     """
-    def __init__(self, server_count=3):
-        self.metrics_logger = MetricsLogger()
-        self.servers = [GameServer(f"Game_Server_{i+1}", self.metrics_logger) for i in range(server_count)]
-        self.current_server_index = 0
+    def __init__(self, server_count=3, verbose=False, expected_players=1024):
+        server_ids = [f"Game_Server_{i+1}" for i in range(server_count)]
+        self.metrics_logger = MetricsLogger(server_ids, capacity=expected_players)
+        self.verbose = verbose
+        self.servers = [GameServer(server_id, self.metrics_logger, idx=i) for i, server_id in enumerate(server_ids)]
         self.player_counter = 0
         self.start_time = None
-        self.server_metrics = {server.id: {'total_requests': 0, 'total_time': 0.0} for server in self.servers}
+        
+        # Per-server totals indexed by GameServer.idx
+        self._total_requests = np.zeros(server_count, dtype=np.int64)
+        self._total_time = np.zeros(server_count, dtype=np.float64)
+        
+        # Set up bidirectional reference
+        for server in self.servers:
+            server.load_balancer = self
+            server.verbose = verbose
 
     def get_next_server(self):
-        """Select the next available server using round-robin algorithm"""
-        start_index = self.current_server_index
-        while True:
-            server = self.servers[self.current_server_index]
-            self.current_server_index = (self.current_server_index + 1) % len(self.servers)
-            
-            if server.is_active:
-                return server
-                
-            if self.current_server_index == start_index:
-                return None
+        """Select an available server using power-of-two-choices on queue length"""
+        active = [server for server in self.servers if server.is_active]
+        if not active:
+            return None
+        if len(active) == 1:
+            return active[0]
+        
+        a, b = random.sample(active, 2)
+        return a if a.request_queue.qsize() <= b.request_queue.qsize() else b
 
     def connect_player(self, player_id):
         """Assign a player to the next available game server"""
         if self.start_time is None:
             self.start_time = datetime.now()
 
-        current_time = datetime.now().strftime("%H:%M:%S")
         server = self.get_next_server()
         
         if server is None:
+            current_time = _hms()
             print(f"❌ [{current_time}] No available servers for Player_{player_id}")
             return False
             
         if server.handle_player(player_id):
-            print(f"➡️  [{current_time}] Player_{player_id} connected to {server.id}")
+            if self.verbose:
+                current_time = _hms()
+                sys.stdout.write(''.join(["➡️  [", current_time, "] Player_", str(player_id),
+                                          " connected to ", server.id, "\n"]))
             return True
         
         return False
 
     def get_server_stats(self):
         """Generate performance statistics for all game servers"""
+        total_requests = self._total_requests.tolist()
+        avg_times = np.divide(self._total_time, self._total_requests,
+                              out=np.zeros_like(self._total_time),
+                              where=self._total_requests > 0).tolist()
+        
         stats = []
         for server in self.servers:
-            metrics = self.server_metrics[server.id]
-            total_requests = metrics['total_requests']
-            avg_time = metrics['total_time'] / total_requests if total_requests > 0 else 0
-            
             stats.append({
                 'id': server.id,
                 'active': server.is_active,
-                'request_count': total_requests,
-                'avg_response_time': avg_time,
-                'players': server.players,
+                'request_count': total_requests[server.idx],
+                'avg_response_time': avg_times[server.idx],
+                'player_count': server.player_count,
+                'recent_players': list(server.recent_players),
                 'queued_requests': server.request_queue.qsize()
             })
         return stats
 
-    def update_metrics(self, server_id, processing_time):
+    def update_metrics(self, server_idx, processing_time):
         """Update performance metrics for a specific server"""
-        metrics = self.server_metrics[server_id]
-        metrics['total_requests'] += 1
-        metrics['total_time'] += processing_time
+        self._total_requests[server_idx] += 1
+        self._total_time[server_idx] += processing_time
+
+    def start(self):
+        """Start the server worker tasks and metrics flusher on the running event loop"""
+        self.metrics_logger.start()
+        for server in self.servers:
+            server.start()
 
-def simulate_game_server(num_players=20, delay_between_requests=0.5):
+    async def wait_for_requests(self):
+        """Wait until every queued player request has been processed"""
+        await asyncio.gather(*(server.request_queue.join() for server in self.servers))
+
+    async def shutdown(self):
+        """Stop the server worker tasks and flush the metrics logs"""
+        try:
+            for server in self.servers:
+                server.stop()
+            await asyncio.gather(*(server._worker for server in self.servers if server._worker is not None),
+                                 return_exceptions=True)
+        finally:
+            self.metrics_logger.close()
+
+def simulate_game_server(num_players=20, delay_between_requests=0.5, verbose=True):
     """
     Run a simulation of the game server load balancer
-    Simulates player connections and request processing
+    Simulates player connections and request processing on a single asyncio event loop
     """
+    asyncio.run(simulate_game_server_async(num_players, delay_between_requests, verbose))
+
+async def simulate_game_server_async(num_players=20, delay_between_requests=0.5, verbose=True):
+    """Coroutine that drives the simulation; see simulate_game_server"""
     # Initialize load balancer
-    load_balancer = GameLoadBalancer()
-    
-    # Set up bidirectional reference
-    for server in load_balancer.servers:
-        server.load_balancer = load_balancer
+    load_balancer = GameLoadBalancer(verbose=verbose, expected_players=num_players)
+    load_balancer.start()
     
     print("\n🎮 Starting Game Server Simulation with 20 players...\n")
     
@@ -228,19 +434,11 @@ def simulate_game_server(num_players=20, delay_between_requests=0.5):
     for i in range(num_players):
         player_id = f"{i+1}"
         load_balancer.connect_player(player_id)
-        time.sleep(delay_between_requests)
+        await asyncio.sleep(delay_between_requests)
     
     # Wait for all requests to complete
-    all_queues_empty = False
-    while not all_queues_empty:
-        all_queues_empty = True
-        for server in load_balancer.servers:
-            if not server.request_queue.empty():
-                all_queues_empty = False
-                break
-        time.sleep(0.1)
-    
-    time.sleep(0.5)
+    await load_balancer.wait_for_requests()
+    await load_balancer.shutdown()
     
     # Print final statistics
     print("\n📊 Final Server Statistics:")
@@ -256,7 +454,7 @@ def simulate_game_server(num_players=20, delay_between_requests=0.5):
         print(f"\n{server['id']}:")
         print(f"  Players Handled: {server['request_count']}")
         print(f"  Average Response Time: {server['avg_response_time']:.3f} seconds")
-        print(f"  Player List: {', '.join([f'Player_{p}' for p in server['players']])}")
+        print(f"  Recent Players: {', '.join([f'Player_{p}' for p in server['recent_players']])}")
     
     print("\n📈 Overall Statistics:")
     print("=" * 50)
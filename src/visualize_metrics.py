@@ -1,7 +1,12 @@
 
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
 from datetime import datetime
+import importlib.util
 import os
 
 def set_custom_style():
@@ -17,28 +22,44 @@ def set_custom_style():
     plt.rcParams['axes.grid'] = True
     plt.rcParams['grid.alpha'] = 0.3
 
+METRICS_CSV = 'output/logs/metrics.csv'
+METRICS_PARQUET = 'output/logs/metrics.parquet'
+
+# Parquet support needs pyarrow or fastparquet; without either, the CSV is parsed on every run
+PARQUET_AVAILABLE = any(importlib.util.find_spec(engine) is not None
+                        for engine in ('pyarrow', 'fastparquet'))
+
 def load_metrics():
     """
     Load and preprocess metrics data from CSV file
-    Converts time strings to datetime objects and processing time to float
+    Column types are parsed in a single read, and the result is cached as Parquet for repeated runs
     """
-    df = pd.read_csv('output/logs/metrics.csv')
-    df['start_time'] = pd.to_datetime(df['start_time'])
-    df['end_time'] = pd.to_datetime(df['end_time'])
-    df['processing_time'] = df['processing_time'].astype(float)
+    # Reuse the Parquet cache unless the CSV has been rewritten since
+    if (PARQUET_AVAILABLE
+            and os.path.exists(METRICS_PARQUET)
+            and os.path.getmtime(METRICS_PARQUET) >= os.path.getmtime(METRICS_CSV)):
+        return pd.read_parquet(METRICS_PARQUET)
+    
+    df = pd.read_csv(METRICS_CSV,
+                     dtype={'player_id': 'string',
+                            'server_id': 'category',
+                            'processing_time': 'float32'},
+                     parse_dates=['start_time', 'end_time'],
+                     engine='c')
+    
+    if PARQUET_AVAILABLE:
+        df.to_parquet(METRICS_PARQUET)
     return df
 
-def create_bar_chart(df):
+def create_bar_chart(ax, by_server):
     """
-    Create bar chart showing average processing time for each game server
+    Draw bar chart showing average processing time for each game server
     Includes custom styling, labels, and green color scheme
     """
-    fig, ax = plt.subplots(figsize=(12, 6))
-    fig.patch.set_facecolor('white')
     ax.set_facecolor('white')
     
     # Calculate average processing time per server
-    avg_times = df.groupby('server_id')['processing_time'].mean()
+    avg_times = by_server.mean()
     
     # Define green color palette
     colors = {
@@ -49,25 +70,25 @@ def create_bar_chart(df):
     }
     
     # Create and style bars
-    bars = plt.bar(avg_times.index, avg_times.values, color=colors['bars'], width=0.6)
+    bars = ax.bar(avg_times.index.astype(str), avg_times.values, color=colors['bars'], width=0.6)
     
     for bar in bars:
         bar.set_edgecolor(colors['box_edge'])
         bar.set_alpha(0.8)
     
-    plt.title('Average Response Time by Game Server', 
-              fontsize=16, 
-              fontweight='bold', 
-              pad=20,
-              color=colors['box_edge'])
+    ax.set_title('Average Response Time by Game Server', 
+                 fontsize=16, 
+                 fontweight='bold', 
+                 pad=20,
+                 color=colors['box_edge'])
     
-    plt.xlabel('Server ID', fontsize=12, color=colors['box_edge'], labelpad=10)
-    plt.ylabel('Average Response Time (seconds)', fontsize=12, color=colors['box_edge'], labelpad=10)
+    ax.set_xlabel('Server ID', fontsize=12, color=colors['box_edge'], labelpad=10)
+    ax.set_ylabel('Average Response Time (seconds)', fontsize=12, color=colors['box_edge'], labelpad=10)
     
     # Add value labels on bars
     for bar in bars:
         height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 0.05,
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.05,
                 f'{height:.2f}s',
                 ha='center', va='bottom',
                 fontsize=10, fontweight='bold',
@@ -81,26 +102,12 @@ def create_bar_chart(df):
     ax.spines['right'].set_visible(False)
     ax.spines['left'].set_color(colors['box_edge'])
     ax.spines['bottom'].set_color(colors['box_edge'])
-    
-    # Create output directory if it doesn't exist
-    os.makedirs('output/visualizations', exist_ok=True)
-    
-    # Save the chart
-    plt.tight_layout()
-    plt.savefig('output/visualizations/server_performance_bar.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor=fig.get_facecolor(),
-                edgecolor='none')
-    plt.close()
 
-def create_line_chart(df):
+def create_line_chart(ax, df):
     """
-    Create line chart showing response time trends for each game server
+    Draw line chart showing response time trends for each game server
     Includes markers, legend, and custom styling
     """
-    fig, ax = plt.subplots(figsize=(12, 6))
-    fig.patch.set_facecolor('white')
     ax.set_facecolor('white')
     
     colors = {
@@ -109,27 +116,43 @@ def create_line_chart(df):
         'grid': '#1b4332'
     }
     
-    for idx, server in enumerate(sorted(df['server_id'].unique())):
-        server_data = df[df['server_id'] == server].sort_values('start_time')
-        plt.plot(range(len(server_data)), 
-                server_data['processing_time'],
-                marker='o',
-                markersize=8,
-                linewidth=2,
-                color=colors['lines'][idx],
-                label=server,
-                alpha=0.8)
-    
-    plt.title('Response Time Trends by Game Server', 
-              fontsize=16, 
-              fontweight='bold', 
-              pad=20,
-              color=colors['text'])
-    
-    plt.xlabel('Player Request Sequence', fontsize=12, color=colors['text'], labelpad=10)
-    plt.ylabel('Response Time (seconds)', fontsize=12, color=colors['text'], labelpad=10)
-    
-    legend = plt.legend(bbox_to_anchor=(1.02, 1), 
+    # Partition once by server; sorting first keeps each group in request order
+    by_server = df.sort_values('start_time').groupby('server_id', observed=True, sort=True)
+    servers = []
+    per_server = []
+    for server, server_data in by_server:
+        servers.append(server)
+        per_server.append(server_data['processing_time'].to_numpy())
+    palette = to_rgba_array([colors['lines'][idx % len(colors['lines'])] for idx in range(len(servers))])
+    counts = [processing_times.size for processing_times in per_server]
+    
+    # Draw every server's line in one collection and every marker in one scatter
+    segments = [np.column_stack([np.arange(processing_times.size), processing_times])
+                for processing_times in per_server]
+    ax.add_collection(LineCollection(segments, colors=palette, linewidths=2, alpha=0.8))
+    point_colors = np.repeat(palette, counts, axis=0)
+    ax.scatter(np.concatenate([np.arange(count) for count in counts]),
+               np.concatenate(per_server),
+               s=64,
+               c=point_colors,
+               edgecolors=point_colors,
+               alpha=0.8,
+               zorder=3)
+    ax.autoscale()
+    
+    ax.set_title('Response Time Trends by Game Server', 
+                 fontsize=16, 
+                 fontweight='bold', 
+                 pad=20,
+                 color=colors['text'])
+    
+    ax.set_xlabel('Player Request Sequence', fontsize=12, color=colors['text'], labelpad=10)
+    ax.set_ylabel('Response Time (seconds)', fontsize=12, color=colors['text'], labelpad=10)
+    
+    handles = [Line2D([], [], color=color, marker='o', markersize=8, linewidth=2, alpha=0.8, label=server)
+               for server, color in zip(servers, palette)]
+    legend = ax.legend(handles=handles,
+                       bbox_to_anchor=(1.02, 1),
                        loc='upper left',
                        borderaxespad=0,
                        frameon=True,
@@ -148,32 +171,20 @@ def create_line_chart(df):
     ax.spines['right'].set_visible(False)
     ax.spines['left'].set_color(colors['text'])
     ax.spines['bottom'].set_color(colors['text'])
-    
-    plt.tight_layout()
-    plt.savefig('output/visualizations/server_performance_line.png',
-                dpi=300,
-                bbox_inches='tight',
-                facecolor=fig.get_facecolor(),
-                edgecolor='none')
-    plt.close()
 
-def create_player_distribution_chart(df):
+def create_player_distribution_chart(ax, by_server):
     """
-    Create pie chart showing distribution of players across game servers
+    Draw pie chart showing distribution of players across game servers
     Includes percentage labels and shadow effect
     """
-    plt.figure(figsize=(10, 8))
-    fig = plt.gcf()
-    fig.patch.set_facecolor('white')
-    
     # Count players per server
-    player_counts = df['server_id'].value_counts()
+    player_counts = by_server.count()
     
     # Green colors for pie chart
     colors = ['#40916c', '#2d6a4f', '#1b4332']
     
-    wedges, texts, autotexts = plt.pie(player_counts.values,
-                                      labels=player_counts.index,
+    wedges, texts, autotexts = ax.pie(player_counts.values,
+                                      labels=player_counts.index.astype(str),
                                       autopct='%1.1f%%',
                                       colors=colors,
                                       startangle=90,
@@ -184,19 +195,11 @@ def create_player_distribution_chart(df):
     plt.setp(autotexts, size=10, weight="bold", color="white")
     plt.setp(texts, size=12, weight="bold", color="#1b4332")
     
-    plt.title('Player Distribution Across Game Servers', 
-              fontsize=16, 
-              fontweight='bold', 
-              pad=20,
-              color='#1b4332')
-    
-    plt.tight_layout()
-    plt.savefig('output/visualizations/player_distribution_pie.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor=fig.get_facecolor(),
-                edgecolor='none')
-    plt.close()
+    ax.set_title('Player Distribution Across Game Servers', 
+                 fontsize=16, 
+                 fontweight='bold', 
+                 pad=20,
+                 color='#1b4332')
 
 def generate_summary_stats(df):
     """
@@ -229,19 +232,33 @@ def main():
     # Load and process metrics data
     df = load_metrics()
     
-    # Generate all visualizations
+    # Generate all visualizations on one figure, sharing the per-server grouping
     print("Generating game server performance visualizations...")
-    create_bar_chart(df)
-    create_line_chart(df)
-    create_player_distribution_chart(df)
+    fig, axes = plt.subplots(1, 3, figsize=(24, 6))
+    fig.patch.set_facecolor('white')
+    
+    by_server = df.groupby('server_id', observed=True)['processing_time']
+    create_bar_chart(axes[0], by_server)
+    create_line_chart(axes[1], df)
+    create_player_distribution_chart(axes[2], by_server)
+    
+    # Create output directory if it doesn't exist
+    os.makedirs('output/visualizations', exist_ok=True)
+    
+    # Save the figure
+    fig.tight_layout()
+    fig.savefig('output/visualizations/server_performance.png',
+                dpi=150,
+                bbox_inches='tight',
+                facecolor=fig.get_facecolor(),
+                edgecolor='none')
+    plt.close(fig)
     
     # Display summary statistics
     generate_summary_stats(df)
     
-    print("\n📈 Visualization files generated in output/visualizations/:")
-    print("  - server_performance_bar.png")
-    print("  - server_performance_line.png")
-    print("  - player_distribution_pie.png")
+    print("\n📈 Visualization file generated in output/visualizations/:")
+    print("  - server_performance.png")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file